@@ -6,103 +6,375 @@ Integração com Google AI Studio
 VERSÃO CORRIGIDA - Formato otimizado para parser TypeScript
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
-import pdfplumber
-import tempfile
+from werkzeug.exceptions import RequestEntityTooLarge
+import fitz  # PyMuPDF
+import orjson
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import chain, islice
+import hashlib
+import multiprocessing
 import os
 import re
-from pathlib import Path
+import threading
+
+# Limpeza nativa em Rust (opcional, ver cnis-clean/); sem ela usa a versão Python
+try:
+    import cnis_clean
+except ImportError:
+    cnis_clean = None
+
+# Hyperscan (opcional, só Linux, instalado à parte com "pip install hyperscan")
+# para localizar cabeçalhos/rodapés. Ordem de precedência da limpeza:
+# extensão nativa, se instalada; senão Python com Hyperscan; senão Python com re
+try:
+    import hyperscan
+except ImportError:
+    hyperscan = None
 
 app = Flask(__name__)
 CORS(app)  # Permite requisições do frontend
 
-def normalizar_espacos(texto):
-    """Remove espaços excessivos e normaliza o layout"""
-    # Remove múltiplos espaços, mantendo apenas um
-    texto = re.sub(r' {2,}', ' ', texto)
-    # Remove espaços no início e fim de cada linha
-    linhas = [linha.strip() for linha in texto.split('\n')]
-    # Remove linhas vazias duplicadas
-    linhas_limpas = []
-    linha_vazia_anterior = False
-    for linha in linhas:
-        if linha:
-            linhas_limpas.append(linha)
-            linha_vazia_anterior = False
-        elif not linha_vazia_anterior:
-            linhas_limpas.append('')
-            linha_vazia_anterior = True
-    return '\n'.join(linhas_limpas)
+# jsonify (health e erros) em UTF-8, sem escapar acentos como \uXXXX;
+# as respostas com o texto extraído já usam orjson (ver _resposta_json)
+app.json.ensure_ascii = False
+
+# Limites de tamanho: o PDF em si e o mesmo PDF codificado em base64
+# (~4/3 do tamanho original), para evitar esgotar a memória do worker
+TAMANHO_MAXIMO_PDF = 50 * 1024 * 1024
+TAMANHO_MAXIMO_BASE64 = 70 * 1024 * 1024
+
+# Folga para o envelope JSON em volta do base64 em /extract-json
+TAMANHO_ENVELOPE_JSON = 1024 * 1024
+
+# Rejeita corpos maiores que o aceito por qualquer endpoint antes de lê-los
+app.config['MAX_CONTENT_LENGTH'] = TAMANHO_MAXIMO_BASE64 + TAMANHO_ENVELOPE_JSON
+
+# Quantidade de páginas extraídas por tarefa no pool de processos
+PAGINAS_POR_LOTE = 50
+
+# Núcleos disponíveis para o processo (respeita o cpuset do container no Linux)
+_CPUS = os.sched_getaffinity(0) if hasattr(os, 'sched_getaffinity') else None
+
+# Quantidade de processos no pool e de lotes em andamento por requisição
+# (limita o texto bruto mantido em memória quando o consumo é lento).
+# No Gunicorn, CNIS_PROCESSOS_POOL divide os núcleos entre os workers
+PROCESSOS_POOL = (int(os.environ.get('CNIS_PROCESSOS_POOL', 0)) or
+                  (len(_CPUS) if _CPUS else (os.cpu_count() or 1)))
+LOTES_EM_ANDAMENTO = 2 * PROCESSOS_POOL
+
+def _criar_executor():
+    """
+    Cria o pool de processos usado na extração paralela das páginas.
+    
+    Os processos nascem do forkserver (ou por spawn, onde ele não existe), e
+    não por fork do worker: o pool é criado e recriado com as threads das
+    requisições já rodando, e um fork nesse estado pode herdar locks presos.
+    """
+    metodo = ('forkserver' if 'forkserver' in multiprocessing.get_all_start_methods()
+              else 'spawn')
+    return ProcessPoolExecutor(max_workers=PROCESSOS_POOL,
+                               mp_context=multiprocessing.get_context(metodo))
+
+# Pool de processos para extração paralela das páginas, criado no primeiro
+# uso (os processos do pool também importam este módulo e não precisam de um)
+# e reaproveitado entre as requisições
+_EXECUTOR = None
+_EXECUTOR_LOCK = threading.Lock()
+
+def _obter_executor(quebrado=None):
+    """
+    Devolve o pool, criando-o no primeiro uso. Se o pool informado ficou
+    inutilizável (um worker morreu, ex: crash do MuPDF ou OOM), ele é
+    substituído por um novo; só a primeira thread a perceber recria o pool.
+    """
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            _EXECUTOR = _criar_executor()
+        elif _EXECUTOR is quebrado:
+            quebrado.shutdown(wait=False, cancel_futures=True)
+            _EXECUTOR = _criar_executor()
+        return _EXECUTOR
+
+def aquecer_pool():
+    """
+    Cria de antemão os processos do pool, que só nascem na primeira tarefa,
+    para que a primeira requisição não espere cada um importar este módulo
+    e o PyMuPDF. Chamado pelo hook post_worker_init do Gunicorn.
+    """
+    executor = _obter_executor()
+    futuros = [executor.submit(os.getpid) for _ in range(PROCESSOS_POOL)]
+    for futuro in futuros:
+        futuro.result()
+
+# Cache LRU dos textos extraídos, indexado pelo hash do PDF (evita
+# reprocessar o mesmo documento quando o frontend repete a requisição).
+# Limitado pelo total de caracteres guardados em cada worker, e não pelo
+# número de textos, que podem ter vários MB cada
+CARACTERES_CACHE = 16 * 1024 * 1024
+_CACHE_TEXTOS = OrderedDict()
+_CACHE_CARACTERES = 0
+_CACHE_LOCK = threading.Lock()
+
+# Expressões regulares pré-compiladas usadas na limpeza do texto
+# Linha que termina com data ou valor monetário (não é quebrada)
+_RE_TAIL_TERMINATOR = re.compile(r'(?:\d{2}/\d{2}/\d{4}|\d+,\d{2})$')
+
+# Padrões para identificar cabeçalhos/rodapés, aplicados às linhas já
+# normalizadas (sem espaços nas pontas; a linha do CNIS casa apenas pelo prefixo)
+_PADROES_CABECALHO_RODAPE = [
+    r'^Página \d+ de \d+$',
+    r'^INSS$',
+    r'^CNIS - Cadastro Nacional',
+    r'^Extrato Previdenciário$',
+    r'^\d{2}/\d{2}/\d{4} \d{2}:\d{2}:\d{2}$'
+]
+
+# Padrões unidos numa única alternação, testada linha a linha
+_RE_HEADER_FOOTER = re.compile('|'.join(_PADROES_CABECALHO_RODAPE))
 
-def consolidar_linhas_quebradas(texto):
+def _compilar_hyperscan():
+    """Compila os padrões de cabeçalho/rodapé num banco do Hyperscan"""
+    if hyperscan is None:
+        return None
+    # MULTILINE: ^ e $ valem por linha, permitindo varrer o texto inteiro de uma vez
+    # UTF8/UCP: mesma semântica de \d do módulo re para texto Unicode
+    flags = (hyperscan.HS_FLAG_MULTILINE | hyperscan.HS_FLAG_UTF8 |
+             hyperscan.HS_FLAG_UCP)
+    banco = hyperscan.Database()
+    banco.compile(
+        expressions=[padrao.encode() for padrao in _PADROES_CABECALHO_RODAPE],
+        ids=list(range(len(_PADROES_CABECALHO_RODAPE))),
+        elements=len(_PADROES_CABECALHO_RODAPE),
+        flags=[flags] * len(_PADROES_CABECALHO_RODAPE)
+    )
+    return banco
+
+# Com a extensão nativa a limpeza nunca passa pelo Hyperscan: não compila o banco
+_HS_DATABASE = _compilar_hyperscan() if cnis_clean is None else None
+
+# Espaço de trabalho do Hyperscan, que não pode ser compartilhado entre threads
+_HS_LOCAL = threading.local()
+
+# Termos que indicam continuação da linha anterior
+_TERMOS_CONTINUACAO = frozenset({'DOMÉSTICO', 'DOMESTICO', 'INDIVIDUAL', 'FACULTATIVO'})
+
+# Extensão nativa configurada com as mesmas constantes acima, que ficam só
+# aqui (os padrões usam apenas a sintaxe comum ao re e ao crate regex do Rust;
+# tests/test_cnis_clean.py garante o mesmo resultado das duas versões)
+_PADROES_NATIVOS = cnis_clean.Padroes(
+    _PADROES_CABECALHO_RODAPE,
+    _RE_TAIL_TERMINATOR.pattern,
+    sorted(_TERMOS_CONTINUACAO)
+) if cnis_clean is not None else None
+
+def _indices_cabecalho_rodape(linhas):
+    """
+    Retorna os índices das linhas (já normalizadas) que são cabeçalho/rodapé.
+    
+    Com o Hyperscan, varre o texto inteiro numa única chamada; sem ele,
+    testa a alternação pré-compilada em cada linha.
     """
-    Consolida linhas que foram quebradas incorretamente.
-    Exemplo: junta "EMPREGADO" com "DOMÉSTICO" na linha seguinte.
+    if _HS_DATABASE is None:
+        return {i for i, linha in enumerate(linhas) if _RE_HEADER_FOOTER.match(linha)}
+    
+    scratch = getattr(_HS_LOCAL, 'scratch', None)
+    if scratch is None:
+        scratch = _HS_LOCAL.scratch = hyperscan.Scratch(_HS_DATABASE)
+    
+    dados = '\n'.join(linhas).encode()
+    fins = set()
+    
+    def _ao_casar(id_padrao, inicio, fim, flags, contexto):
+        fins.add(fim)
+    
+    _HS_DATABASE.scan(dados, match_event_handler=_ao_casar, scratch=scratch)
+    
+    # Converte os offsets finais (em bytes) em índices de linha contando as
+    # quebras; nenhum padrão atravessa o fim da linha
+    indices = set()
+    indice = 0
+    posicao = 0
+    for fim in sorted(fins):
+        indice += dados.count(b'\n', posicao, fim)
+        posicao = fim
+        indices.add(indice)
+    return indices
+
+def _limpar_paginas(paginas):
     """
-    linhas = texto.split('\n')
-    linhas_consolidadas = []
-    i = 0
+    Gera, para cada página, a lista das suas linhas já limpas.
     
-    while i < len(linhas):
-        linha_atual = linhas[i].strip()
+    Aplica, linha a linha, o pipeline de limpeza e formatação:
+    normaliza espaços, remove cabeçalhos/rodapés, descarta linhas vazias
+    duplicadas e consolida linhas quebradas incorretamente
+    (ex: junta "EMPREGADO" com "DOMÉSTICO" na linha seguinte).
+    O estado é mantido entre as páginas, então o resultado é o mesmo de
+    limpar o texto de todas as páginas unido por '\n'.
+    """
+    # Última linha não vazia, aguardando a próxima para saber se deve ser consolidada
+    linha_pendente = None
+    linha_vazia_anterior = False
+    
+    # Referências locais, evitando buscas de atributo/global a cada linha
+    termos_continuacao = _TERMOS_CONTINUACAO
+    termina_com_data_ou_valor = _RE_TAIL_TERMINATOR.search
+    
+    for texto_pagina in paginas:
+        linhas_limpas = []
+        adicionar = linhas_limpas.append
+        
+        # 1. Normaliza espaços: remove os do início e fim e mantém apenas
+        # um entre as palavras (split/join em C, sem passar por regex)
+        linhas = [' '.join(linha.split()) for linha in texto_pagina.split('\n')]
+        cabecalhos_rodapes = _indices_cabecalho_rodape(linhas)
         
-        # Se a linha atual não está vazia
-        if linha_atual:
-            # Verifica se a próxima linha é uma continuação
-            if i + 1 < len(linhas):
-                proxima_linha = linhas[i + 1].strip()
-                
-                # Padrões de continuação:
-                # 1. Linha atual termina com palavra incompleta (ex: "EMPREGADO")
-                # 2. Próxima linha começa com complemento (ex: "DOMÉSTICO")
-                # 3. Linha atual não termina com pontuação ou número
-                
-                # Lista de termos que indicam continuação
-                termos_continuacao = ['DOMÉSTICO', 'DOMESTICO', 'INDIVIDUAL', 'FACULTATIVO']
-                
-                # Se a próxima linha é um termo de continuação e a atual não tem data/número no final
-                if (proxima_linha in termos_continuacao and 
-                    not re.search(r'\d{2}/\d{2}/\d{4}$', linha_atual) and
-                    not re.search(r'\d+,\d{2}$', linha_atual)):
-                    linha_atual = linha_atual + ' ' + proxima_linha
-                    i += 1  # Pula a próxima linha pois já foi consolidada
+        for i, linha in enumerate(linhas):
+            # 2. Remove cabeçalhos e rodapés
+            if i in cabecalhos_rodapes:
+                continue
+            
+            # 3. Remove linhas vazias duplicadas
+            if not linha:
+                if linha_vazia_anterior:
+                    continue
+                linha_vazia_anterior = True
+                if linha_pendente is not None:
+                    adicionar(linha_pendente)
+                    linha_pendente = None
+                adicionar('')
+                continue
+            linha_vazia_anterior = False
             
-            linhas_consolidadas.append(linha_atual)
-        else:
-            linhas_consolidadas.append('')
+            # 4. Consolida linhas quebradas: se a linha é um termo de continuação
+            # e a anterior não tem data/número no final, junta as duas
+            if linha_pendente is not None:
+                if (linha in termos_continuacao and
+                    not termina_com_data_ou_valor(linha_pendente)):
+                    adicionar(linha_pendente + ' ' + linha)
+                    linha_pendente = None
+                    continue
+                adicionar(linha_pendente)
+            linha_pendente = linha
         
-        i += 1
+        yield linhas_limpas
     
-    return '\n'.join(linhas_consolidadas)
+    if linha_pendente is not None:
+        yield [linha_pendente]
 
-def limpar_cabecalhos_rodapes(texto):
-    """Remove cabeçalhos e rodapés repetitivos de cada página"""
-    linhas = texto.split('\n')
-    linhas_limpas = []
+def _limpar_blocos(paginas):
+    """
+    Gera o texto limpo de cada página (suas linhas unidas por '\n'), usando
+    a extensão nativa quando disponível; unidos por '\n', os blocos formam
+    o texto limpo do documento inteiro.
+    """
+    if _PADROES_NATIVOS is None:
+        for linhas in _limpar_paginas(paginas):
+            if linhas:
+                yield '\n'.join(linhas)
+        return
     
-    # Padrões para identificar cabeçalhos/rodapés
-    padroes_ignorar = [
-        r'^Página \d+ de \d+$',
-        r'^INSS\s*$',
-        r'^CNIS - Cadastro Nacional',
-        r'^Extrato Previdenciário\s*$',
-        r'^\d{2}/\d{2}/\d{4} \d{2}:\d{2}:\d{2}$'
-    ]
+    limpeza = _PADROES_NATIVOS.documento()
+    for texto_pagina in paginas:
+        bloco = limpeza.pagina(texto_pagina)
+        if bloco is not None:
+            yield bloco
+    bloco = limpeza.finalizar()
+    if bloco is not None:
+        yield bloco
+
+def _extrair_intervalo(pdf_bytes, inicio, fim):
+    """Extrai o texto das páginas [inicio, fim) do PDF (executa no pool)"""
+    textos = []
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as pdf:
+        for i in range(inicio, fim):
+            pagina = pdf[i]
+            # Páginas sem nenhuma fonte (só imagens ou gráficos, ex: assinaturas
+            # e documentos digitalizados) não têm texto: pula sem interpretar
+            # o conteúdo da página. Anotações e campos de formulário têm
+            # aparência própria, que o get_text também lê, então essas ficam
+            if (not pagina.get_fonts() and pagina.first_annot is None
+                    and pagina.first_widget is None):
+                continue
+            # Usa o modo "text" (sem análise de layout), bem mais rápido
+            # que o pdfplumber; a ordem de leitura é tratada pelo PyMuPDF.
+            # Retira a quebra de linha que o PyMuPDF põe no fim da página e o
+            # extract_text do pdfplumber não punha: unidas por '\n', as páginas
+            # não ganham uma linha vazia entre si
+            textos.append(pagina.get_text("text").rstrip('\n'))
+    return textos
+
+def _extrair_lotes(pdf_bytes, num_paginas):
+    """
+    Gera o texto das páginas de cada lote no pool, na ordem do PDF.
     
-    for linha in linhas:
-        # Verifica se a linha corresponde a algum padrão de cabeçalho/rodapé
-        eh_cabecalho_rodape = False
-        for padrao in padroes_ignorar:
-            if re.match(padrao, linha.strip()):
-                eh_cabecalho_rodape = True
-                break
-        
-        # Só adiciona se não for cabeçalho/rodapé ou se for uma linha importante
-        if not eh_cabecalho_rodape:
-            linhas_limpas.append(linha)
+    Mantém no máximo LOTES_EM_ANDAMENTO tarefas submetidas, enviando o
+    próximo lote à medida que um é consumido. Se o pool quebrar, ele é
+    recriado e os lotes pendentes são reenviados uma única vez (um PDF que
+    derruba o MuPDF de novo vira erro, sem derrubar o worker do Gunicorn).
+    """
+    intervalos = ((inicio, min(inicio + PAGINAS_POR_LOTE, num_paginas))
+                  for inicio in range(0, num_paginas, PAGINAS_POR_LOTE))
+    executor = _obter_executor()
+    recriado = False
+    pendentes = deque()  # (intervalo, futuro), na ordem das páginas
+    try:
+        while True:
+            try:
+                while len(pendentes) < LOTES_EM_ANDAMENTO:
+                    intervalo = next(intervalos, None)
+                    if intervalo is None:
+                        break
+                    # Entra na fila antes do submit, para ser reenviado se ele falhar
+                    pendentes.append((intervalo, None))
+                    futuro = executor.submit(_extrair_intervalo, pdf_bytes, *intervalo)
+                    pendentes[-1] = (intervalo, futuro)
+                if not pendentes:
+                    break
+                lote = pendentes[0][1].result()
+            except BrokenProcessPool:
+                executor = _obter_executor(executor)
+                if recriado:
+                    raise
+                recriado = True
+                # Devolve os lotes pendentes ao início da fila para reenviá-los
+                intervalos = chain([intervalo for intervalo, _ in pendentes], intervalos)
+                pendentes.clear()
+                continue
+            pendentes.popleft()
+            yield lote
+    finally:
+        # Cliente desconectado ou erro: descarta os lotes que ainda não começaram
+        for _, futuro in pendentes:
+            if futuro is not None:
+                futuro.cancel()
+
+def _extrair_paginas(pdf_bytes):
+    """Gera o texto bruto de cada página com conteúdo, na ordem do PDF"""
+    # Abre o PDF direto da memória, sem passar por arquivo temporário
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as pdf:
+        num_paginas = pdf.page_count
     
-    return '\n'.join(linhas_limpas)
+    # Divide as páginas em lotes contíguos extraídos no pool, inclusive os
+    # PDFs de um único lote: o PyMuPDF segura o GIL, e extraí-los no próprio
+    # worker limitaria o Gunicorn a um núcleo por worker
+    for texto_pagina in chain.from_iterable(_extrair_lotes(pdf_bytes, num_paginas)):
+        if texto_pagina:
+            yield texto_pagina
+
+def extrair_texto_cnis_stream(pdf_bytes):
+    """
+    Extrai o texto de um PDF CNIS página a página, já limpo e formatado.
+    
+    Gera um bloco de texto por página, sem manter o texto bruto do
+    documento inteiro em memória; unidos por '\n', os blocos formam
+    o mesmo texto retornado por extrair_texto_cnis.
+    """
+    return _limpar_blocos(_extrair_paginas(pdf_bytes))
 
 def extrair_texto_cnis(pdf_bytes):
     """
@@ -114,46 +386,117 @@ def extrair_texto_cnis(pdf_bytes):
     Returns:
         Texto extraído formatado e otimizado
     """
-    texto_completo = []
-    
-    # Cria arquivo temporário
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
-        tmp_file.write(pdf_bytes)
-        tmp_path = tmp_file.name
-    
-    try:
-        with pdfplumber.open(tmp_path) as pdf:
-            for pagina in pdf.pages:
-                # AJUSTE CRÍTICO: usa layout=False para texto mais limpo
-                # e ajusta tolerâncias para melhor extração
-                texto_pagina = pagina.extract_text(
-                    layout=False,  # Mudança principal!
-                    x_tolerance=3,
-                    y_tolerance=3
-                )
-                if texto_pagina:
-                    texto_completo.append(texto_pagina)
-    finally:
-        # Remove arquivo temporário
-        Path(tmp_path).unlink(missing_ok=True)
+    # Limpa página a página (com ou sem a extensão nativa), sem unir o
+    # texto bruto do documento inteiro
+    return '\n'.join(extrair_texto_cnis_stream(pdf_bytes))
+
+
+def extrair_texto_cnis_cache(pdf_bytes):
+    """
+    Versão de extrair_texto_cnis com cache pelo conteúdo do PDF.
     
-    # Junta todas as páginas
-    texto_bruto = '\n'.join(texto_completo)
+    Usa apenas o hash blake2b como chave, para não manter os bytes
+    dos PDFs em memória.
+    """
+    global _CACHE_CARACTERES
+    chave = hashlib.blake2b(pdf_bytes, digest_size=16).digest()
+    with _CACHE_LOCK:
+        texto = _CACHE_TEXTOS.get(chave)
+        if texto is not None:
+            _CACHE_TEXTOS.move_to_end(chave)
+            return texto
     
-    # PIPELINE DE LIMPEZA E FORMATAÇÃO:
-    # 1. Remove cabeçalhos e rodapés
-    texto_limpo = limpar_cabecalhos_rodapes(texto_bruto)
+    texto = extrair_texto_cnis(pdf_bytes)
     
-    # 2. Normaliza espaços
-    texto_limpo = normalizar_espacos(texto_limpo)
+    # Textos maiores que o cache inteiro não são guardados
+    if len(texto) > CARACTERES_CACHE:
+        return texto
     
-    # 3. Consolida linhas quebradas
-    texto_limpo = consolidar_linhas_quebradas(texto_limpo)
+    with _CACHE_LOCK:
+        # Outra thread pode ter extraído o mesmo PDF enquanto isso
+        if chave not in _CACHE_TEXTOS:
+            _CACHE_TEXTOS[chave] = texto
+            _CACHE_CARACTERES += len(texto)
+            # Descarta os textos usados há mais tempo até caber no limite
+            while _CACHE_CARACTERES > CARACTERES_CACHE:
+                _, antigo = _CACHE_TEXTOS.popitem(last=False)
+                _CACHE_CARACTERES -= len(antigo)
+    return texto
+
+
+def calcular_estatisticas(texto):
+    """Calcula as estatísticas do texto extraído sem montar a lista de linhas"""
+    return {
+        'linhas': texto.count('\n') + 1,
+        'caracteres': len(texto),
+        'palavras': len(texto.split())
+    }
+
+
+def _resposta_json(dados):
+    """
+    Serializa a resposta com orjson, bem mais rápido que o jsonify
+    para o campo 'texto', que pode ter vários MB.
+    """
+    return Response(orjson.dumps(dados), mimetype='application/json')
+
+
+def _quer_ndjson():
+    """Indica se o cliente pediu a resposta em streaming (Accept: application/x-ndjson)"""
+    melhor = request.accept_mimetypes.best_match(['application/json', 'application/x-ndjson'])
+    return melhor == 'application/x-ndjson'
+
+
+def _resposta_ndjson(pdf_bytes, extras):
+    """
+    Transmite o texto em NDJSON, um registro por página à medida que é
+    extraída, seguido de um registro final com as estatísticas.
+    """
+    # Extrai o primeiro bloco antes de enviar o status: PDF inválido ou
+    # corrompido ainda gera a exceção aqui e vira erro 500 no endpoint
+    texto_blocos = extrair_texto_cnis_stream(pdf_bytes)
+    primeiro = next(texto_blocos, None)
+    if primeiro is not None:
+        texto_blocos = chain([primeiro], texto_blocos)
     
-    # 4. Normalização final de espaços
-    texto_limpo = normalizar_espacos(texto_limpo)
+    def gerar():
+        linhas = caracteres = palavras = blocos = 0
+        try:
+            for bloco in texto_blocos:
+                linhas += bloco.count('\n') + 1
+                caracteres += len(bloco)
+                palavras += len(bloco.split())
+                blocos += 1
+                yield orjson.dumps({'texto': bloco}) + b'\n'
+        except Exception as e:
+            # O status já foi enviado: informa o erro num registro próprio
+            yield orjson.dumps({
+                'error': 'Erro ao processar arquivo',
+                'message': str(e)
+            }) + b'\n'
+            return
+        
+        # Mesmas estatísticas de calcular_estatisticas sobre o texto unido por '\n'
+        yield orjson.dumps({
+            'success': True,
+            'estatisticas': {
+                'linhas': linhas or 1,
+                'caracteres': caracteres + max(blocos - 1, 0),
+                'palavras': palavras
+            },
+            **extras
+        }) + b'\n'
     
-    return texto_limpo
+    return Response(stream_with_context(gerar()), mimetype='application/x-ndjson')
+
+
+@app.errorhandler(RequestEntityTooLarge)
+def arquivo_muito_grande(e):
+    """Resposta em JSON para requisições acima do tamanho máximo"""
+    return jsonify({
+        'error': 'Arquivo muito grande',
+        'message': f'O PDF deve ter no máximo {TAMANHO_MAXIMO_PDF // (1024 * 1024)} MB'
+    }), 413
 
 
 @app.route('/health', methods=['GET'])
@@ -200,29 +543,32 @@ def extract_cnis():
         
         # Lê o arquivo
         pdf_bytes = file.read()
+        if len(pdf_bytes) > TAMANHO_MAXIMO_PDF:
+            raise RequestEntityTooLarge()
         
-        # Extrai o texto
-        texto_extraido = extrair_texto_cnis(pdf_bytes)
+        # Transmite página a página quando o cliente pede NDJSON
+        if _quer_ndjson():
+            return _resposta_ndjson(pdf_bytes, {
+                'arquivo': file.filename,
+                'versao': '2.0-optimized'
+            })
         
-        # Calcula estatísticas
-        linhas = texto_extraido.split('\n')
-        num_linhas = len(linhas)
-        num_chars = len(texto_extraido)
-        num_palavras = len(texto_extraido.split())
+        # Extrai o texto
+        texto_extraido = extrair_texto_cnis_cache(pdf_bytes)
         
         # Retorna resultado
-        return jsonify({
+        return _resposta_json({
             'success': True,
             'texto': texto_extraido,
-            'estatisticas': {
-                'linhas': num_linhas,
-                'caracteres': num_chars,
-                'palavras': num_palavras
-            },
+            'estatisticas': calcular_estatisticas(texto_extraido),
             'arquivo': file.filename,
             'versao': '2.0-optimized'
         })
     
+    except RequestEntityTooLarge:
+        # Tratado por arquivo_muito_grande (413)
+        raise
+    
     except Exception as e:
         return jsonify({
             'error': 'Erro ao processar arquivo',
@@ -237,7 +583,10 @@ def extract_cnis_json():
     Útil para integração com Google AI Studio.
     """
     try:
-        data = request.get_json()
+        # Lê o corpo bruto sem guardá-lo na requisição e faz o parse com orjson
+        corpo = request.get_data(cache=False)
+        data = orjson.loads(corpo) if corpo else None
+        del corpo
         
         if not data or 'pdf_base64' not in data:
             return jsonify({
@@ -247,30 +596,35 @@ def extract_cnis_json():
         
         import base64
         
-        # Decodifica base64
-        pdf_bytes = base64.b64decode(data['pdf_base64'])
+        # Rejeita o base64 grande demais antes de decodificá-lo
+        if len(data['pdf_base64']) > TAMANHO_MAXIMO_BASE64:
+            raise RequestEntityTooLarge()
         
-        # Extrai o texto
-        texto_extraido = extrair_texto_cnis(pdf_bytes)
+        # Decodifica base64, retirando a string do dicionário para que seja
+        # liberada logo após a decodificação
+        pdf_bytes = base64.b64decode(data.pop('pdf_base64'), validate=False)
+        if len(pdf_bytes) > TAMANHO_MAXIMO_PDF:
+            raise RequestEntityTooLarge()
         
-        # Calcula estatísticas
-        linhas = texto_extraido.split('\n')
-        num_linhas = len(linhas)
-        num_chars = len(texto_extraido)
-        num_palavras = len(texto_extraido.split())
+        # Transmite página a página quando o cliente pede NDJSON
+        if _quer_ndjson():
+            return _resposta_ndjson(pdf_bytes, {'versao': '2.0-optimized'})
+        
+        # Extrai o texto
+        texto_extraido = extrair_texto_cnis_cache(pdf_bytes)
         
         # Retorna resultado
-        return jsonify({
+        return _resposta_json({
             'success': True,
             'texto': texto_extraido,
-            'estatisticas': {
-                'linhas': num_linhas,
-                'caracteres': num_chars,
-                'palavras': num_palavras
-            },
+            'estatisticas': calcular_estatisticas(texto_extraido),
             'versao': '2.0-optimized'
         })
     
+    except RequestEntityTooLarge:
+        # Tratado por arquivo_muito_grande (413)
+        raise
+    
     except Exception as e:
         return jsonify({
             'error': 'Erro ao processar arquivo',
@@ -279,5 +633,6 @@ def extract_cnis_json():
 
 
 if __name__ == '__main__':
-    # Modo desenvolvimento
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    # Servidor de desenvolvimento; em produção use o Gunicorn (gunicorn.conf.py)
+    app.run(host='0.0.0.0', port=5000,
+            debug=os.environ.get('FLASK_ENV') == 'development')
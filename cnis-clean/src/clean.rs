@@ -0,0 +1,120 @@
+//! Pipeline de limpeza do texto CNIS, linha a linha e numa única passada.
+//!
+//! Espelha `_limpar_paginas` de `api_cnis.py`: normaliza espaços, remove
+//! cabeçalhos/rodapés, descarta linhas vazias duplicadas e consolida linhas
+//! quebradas (ex: junta "EMPREGADO" com "DOMÉSTICO" na linha seguinte).
+//! Os padrões e termos não ficam aqui: vêm do Python (ver `Padroes::new`).
+
+use std::collections::HashSet;
+
+use regex::Regex;
+
+/// Padrões compilados da limpeza, recebidos de `api_cnis.py`.
+pub struct Padroes {
+    cabecalho_rodape: Regex,
+    terminador: Regex,
+    termos_continuacao: HashSet<String>,
+}
+
+impl Padroes {
+    /// Compila os padrões de cabeçalho/rodapé (unidos numa alternação, como
+    /// `_RE_HEADER_FOOTER`), o de fim de linha com data/valor e os termos de
+    /// continuação.
+    pub fn new(
+        cabecalho_rodape: &[String],
+        terminador: &str,
+        termos_continuacao: &[String],
+    ) -> Result<Self, regex::Error> {
+        Ok(Padroes {
+            cabecalho_rodape: Regex::new(&cabecalho_rodape.join("|"))?,
+            terminador: Regex::new(terminador)?,
+            termos_continuacao: termos_continuacao.iter().cloned().collect(),
+        })
+    }
+}
+
+/// Mesmo critério de `str.isspace` do Python, que também trata os
+/// separadores de controle U+001C..U+001F como espaço.
+fn eh_espaco(c: char) -> bool {
+    c.is_whitespace() || ('\u{1c}'..='\u{1f}').contains(&c)
+}
+
+/// Equivalente a `' '.join(linha.split())`.
+fn normalizar_espacos(linha: &str, destino: &mut String) {
+    destino.clear();
+    for palavra in linha.split(eh_espaco).filter(|p| !p.is_empty()) {
+        if !destino.is_empty() {
+            destino.push(' ');
+        }
+        destino.push_str(palavra);
+    }
+}
+
+/// Acrescenta uma linha ao bloco, separando-a da anterior com `\n`.
+fn emitir(bloco: &mut Option<String>, linha: &str) {
+    match bloco {
+        Some(texto) => {
+            texto.push('\n');
+            texto.push_str(linha);
+        }
+        None => *bloco = Some(linha.to_owned()),
+    }
+}
+
+/// Estado da limpeza de um documento, mantido entre as páginas.
+#[derive(Default)]
+pub struct Limpeza {
+    /// Última linha não vazia, aguardando a próxima para saber se deve ser consolidada
+    linha_pendente: Option<String>,
+    linha_vazia_anterior: bool,
+}
+
+impl Limpeza {
+    /// Limpa o texto de uma página e devolve o bloco com as linhas já
+    /// definidas (`None` se não houver nenhuma); a última linha pode ficar
+    /// pendente para a página seguinte ou para `finalizar`.
+    pub fn pagina(&mut self, padroes: &Padroes, texto: &str) -> Option<String> {
+        let mut bloco = None;
+        let mut linha = String::new();
+
+        for bruta in texto.split('\n') {
+            normalizar_espacos(bruta, &mut linha);
+
+            if padroes.cabecalho_rodape.is_match(&linha) {
+                continue;
+            }
+
+            if linha.is_empty() {
+                if self.linha_vazia_anterior {
+                    continue;
+                }
+                self.linha_vazia_anterior = true;
+                if let Some(pendente) = self.linha_pendente.take() {
+                    emitir(&mut bloco, &pendente);
+                }
+                emitir(&mut bloco, "");
+                continue;
+            }
+            self.linha_vazia_anterior = false;
+
+            if let Some(mut pendente) = self.linha_pendente.take() {
+                if padroes.termos_continuacao.contains(&linha)
+                    && !padroes.terminador.is_match(&pendente)
+                {
+                    pendente.push(' ');
+                    pendente.push_str(&linha);
+                    emitir(&mut bloco, &pendente);
+                    continue;
+                }
+                emitir(&mut bloco, &pendente);
+            }
+            self.linha_pendente = Some(linha.clone());
+        }
+        bloco
+    }
+
+    /// Devolve a linha que ficou pendente ao fim do documento.
+    pub fn finalizar(&mut self) -> Option<String> {
+        self.linha_pendente.take()
+    }
+}
@@ -0,0 +1,66 @@
+//! Módulo Python `cnis_clean`: versão nativa da limpeza do texto CNIS.
+
+use std::sync::Arc;
+
+use pyo3::exceptions::PyValueError;
+use pyo3::prelude::*;
+
+mod clean;
+
+/// Padrões da limpeza, compilados uma vez a partir das constantes de `api_cnis.py`.
+#[pyclass(frozen, name = "Padroes")]
+struct PyPadroes(Arc<clean::Padroes>);
+
+#[pymethods]
+impl PyPadroes {
+    #[new]
+    fn new(
+        cabecalho_rodape: Vec<String>,
+        terminador: &str,
+        termos_continuacao: Vec<String>,
+    ) -> PyResult<Self> {
+        clean::Padroes::new(&cabecalho_rodape, terminador, &termos_continuacao)
+            .map(|padroes| PyPadroes(Arc::new(padroes)))
+            .map_err(|e| PyValueError::new_err(e.to_string()))
+    }
+
+    /// Inicia a limpeza de um novo documento.
+    fn documento(&self) -> PyLimpeza {
+        PyLimpeza {
+            padroes: Arc::clone(&self.0),
+            estado: clean::Limpeza::default(),
+        }
+    }
+}
+
+/// Limpeza de um documento página a página (mesmo resultado de
+/// `_limpar_paginas`), mantendo o estado entre as páginas.
+#[pyclass(name = "Limpeza")]
+struct PyLimpeza {
+    padroes: Arc<clean::Padroes>,
+    estado: clean::Limpeza,
+}
+
+#[pymethods]
+impl PyLimpeza {
+    /// Limpa o texto de uma página; devolve suas linhas unidas por `\n`,
+    /// ou `None` se nenhuma linha ficou definida.
+    fn pagina(&mut self, py: Python<'_>, texto: &str) -> Option<String> {
+        let padroes: &clean::Padroes = &self.padroes;
+        let estado = &mut self.estado;
+        // Libera o GIL durante a limpeza, que não toca em objetos Python
+        py.allow_threads(|| estado.pagina(padroes, texto))
+    }
+
+    /// Devolve a linha que ficou pendente ao fim do documento, se houver.
+    fn finalizar(&mut self) -> Option<String> {
+        self.estado.finalizar()
+    }
+}
+
+#[pymodule]
+fn cnis_clean(m: &Bound<'_, PyModule>) -> PyResult<()> {
+    m.add_class::<PyPadroes>()?;
+    m.add_class::<PyLimpeza>()?;
+    Ok(())
+}
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""
+Configuração do Gunicorn para produção da API de Extração de CNIS
+Uso: gunicorn --config gunicorn.conf.py api_cnis:app
+"""
+
+import os
+
+# Núcleos disponíveis (respeita o cpuset do container no Linux)
+if hasattr(os, 'sched_getaffinity'):
+    cpus = len(os.sched_getaffinity(0))
+else:
+    cpus = os.cpu_count() or 1
+
+# Porta definida pelo ambiente (ex: Cloud Run), 8080 por padrão
+bind = f":{os.environ.get('PORT', '8080')}"
+
+# Poucos workers HTTP: toda extração roda no pool de processos de cada
+# worker, então os núcleos são divididos entre os pools (ver PROCESSOS_POOL
+# em api_cnis.py) em vez de multiplicados pelo número de workers
+workers = min(2, cpus)
+processos_pool = int(os.environ.setdefault('CNIS_PROCESSOS_POOL',
+                                           str(max(1, cpus // workers))))
+
+# Threads suficientes para manter o pool ocupado com vários PDFs pequenos
+# (um lote cada) enquanto outras requisições limpam e enviam o texto
+worker_class = 'gthread'
+threads = max(4, 2 * processos_pool)
+
+# PDFs grandes podem demorar para serem processados
+timeout = 120
+
+def post_worker_init(worker):
+    """Sobe o pool de processos da extração antes da primeira requisição"""
+    import api_cnis
+    api_cnis.aquecer_pool()
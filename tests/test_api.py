@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+Extração de PDFs gerados com o PyMuPDF, respostas em NDJSON e cache dos textos.
+"""
+
+import base64
+import unittest
+from unittest import mock
+
+import fitz
+import orjson
+
+import api_cnis
+
+
+def criar_pdf(*paginas):
+    """PDF com uma página por texto dado (linhas separadas por '\\n')"""
+    with fitz.open() as pdf:
+        for texto in paginas:
+            pdf.new_page().insert_text((72, 72), texto)
+        return pdf.tobytes()
+
+
+class TestExtracao(unittest.TestCase):
+
+    def test_paginas_sem_linha_vazia_entre_si(self):
+        pdf_bytes = criar_pdf('Nome: FULANO\nNIT 123', 'Vínculos\nEMPRESA X')
+        self.assertEqual(api_cnis.extrair_texto_cnis(pdf_bytes),
+                         'Nome: FULANO\nNIT 123\nVínculos\nEMPRESA X')
+
+    def test_junta_termo_de_continuacao_entre_paginas(self):
+        pdf_bytes = criar_pdf('Tipo\nEMPREGADO', 'DOMÉSTICO\nEMPRESA X')
+        self.assertEqual(api_cnis.extrair_texto_cnis(pdf_bytes),
+                         'Tipo\nEMPREGADO DOMÉSTICO\nEMPRESA X')
+
+    def test_ignora_paginas_em_branco(self):
+        pdf_bytes = criar_pdf('a', '', 'b')
+        self.assertEqual(api_cnis.extrair_texto_cnis(pdf_bytes), 'a\nb')
+
+
+class TestNdjson(unittest.TestCase):
+
+    def pedir_ndjson(self, pdf_bytes):
+        """Registros NDJSON de /extract-json para o PDF dado"""
+        resposta = api_cnis.app.test_client().post(
+            '/extract-json',
+            data=orjson.dumps({'pdf_base64': base64.b64encode(pdf_bytes).decode()}),
+            content_type='application/json',
+            headers={'Accept': 'application/x-ndjson'}
+        )
+        self.assertEqual(resposta.status_code, 200, msg=resposta.data)
+        return [orjson.loads(linha) for linha in resposta.data.splitlines()]
+
+    def assertEstatisticas(self, blocos):
+        # As estatísticas são somadas bloco a bloco; devem ser as mesmas do
+        # texto unido por '\n' (o que o endpoint JSON retorna)
+        with mock.patch.object(api_cnis, 'extrair_texto_cnis_stream',
+                               lambda pdf_bytes: iter(blocos)):
+            registros = self.pedir_ndjson(b'%PDF')
+        self.assertEqual([r['texto'] for r in registros[:-1]], blocos)
+        self.assertEqual(registros[-1]['estatisticas'],
+                         api_cnis.calcular_estatisticas('\n'.join(blocos)),
+                         msg=repr(blocos))
+
+    def test_estatisticas_sem_blocos(self):
+        self.assertEstatisticas([])
+
+    def test_estatisticas_bloco_vazio(self):
+        self.assertEstatisticas([''])
+
+    def test_estatisticas_varios_blocos(self):
+        for blocos in [['a'], ['a b\nc'], ['a\n', 'b'], ['', ''],
+                       ['Nome: FULANO\n\nNIT 123', '', 'EMPREGADO DOMÉSTICO']]:
+            self.assertEstatisticas(blocos)
+
+    def test_mesmo_texto_do_endpoint_json(self):
+        pdf_bytes = criar_pdf('Nome: FULANO\nNIT 123', 'INSS', 'EMPREGADO', 'DOMÉSTICO')
+        registros = self.pedir_ndjson(pdf_bytes)
+        texto = '\n'.join(r['texto'] for r in registros[:-1])
+        self.assertEqual(texto, api_cnis.extrair_texto_cnis(pdf_bytes))
+        self.assertEqual(registros[-1]['estatisticas'], api_cnis.calcular_estatisticas(texto))
+
+
+class TestCache(unittest.TestCase):
+
+    def setUp(self):
+        patchers = [
+            mock.patch.object(api_cnis, 'CARACTERES_CACHE', 10),
+            mock.patch.object(api_cnis, '_CACHE_TEXTOS', api_cnis.OrderedDict()),
+            mock.patch.object(api_cnis, '_CACHE_CARACTERES', 0),
+            # O "PDF" já é o texto extraído
+            mock.patch.object(api_cnis, 'extrair_texto_cnis', bytes.decode),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def textos_em_cache(self):
+        return sorted(api_cnis._CACHE_TEXTOS.values())
+
+    def test_descarta_os_mais_antigos_pelo_total_de_caracteres(self):
+        for texto in [b'aaaa', b'bbbb', b'aaaa', b'ccc']:
+            self.assertEqual(api_cnis.extrair_texto_cnis_cache(texto), texto.decode())
+        # 'bbbb' foi o menos usado recentemente e saiu para caber 'ccc'
+        self.assertEqual(self.textos_em_cache(), ['aaaa', 'ccc'])
+        self.assertEqual(api_cnis._CACHE_CARACTERES, 7)
+
+    def test_nao_guarda_texto_maior_que_o_cache(self):
+        api_cnis.extrair_texto_cnis_cache(b'aaaa')
+        self.assertEqual(api_cnis.extrair_texto_cnis_cache(b'x' * 11), 'x' * 11)
+        self.assertEqual(self.textos_em_cache(), ['aaaa'])
+        self.assertEqual(api_cnis._CACHE_CARACTERES, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
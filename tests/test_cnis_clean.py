@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+Paridade entre a limpeza nativa (cnis_clean, em Rust) e a versão Python.
+
+As duas precisam gerar exatamente o mesmo texto, página a página; o teste
+é ignorado quando a extensão não está instalada.
+"""
+
+import random
+import unittest
+
+import api_cnis
+
+# Linhas típicas de um CNIS e casos de borda (espaços, cabeçalhos, quebras)
+LINHAS = [
+    'Página 1 de 3', 'Página  12 de 30', 'INSS', '  INSS  ',
+    'CNIS - Cadastro Nacional de Informações Sociais', 'Extrato Previdenciário',
+    '01/02/2020 10:11:12', 'EMPREGADO', 'DOMÉSTICO', ' DOMESTICO\t',
+    'INDIVIDUAL', 'FACULTATIVO', 'CONTRIBUINTE', 'Remuneração 1.234,56',
+    'Data Início 01/02/2020', 'Competência  01/2020   1.000,00', '', '   ',
+    '  a   b  c ', 'x\ty', 'x\x1cy', 'NIT 123.45678.90-1',
+    '١٢/٠١/٢٠٢٠ ١٠:١١:١٢', 'Página ٣ de ٤', 'ç ã õ',
+]
+
+
+def _limpar_python(paginas):
+    """Bloco de cada página (None se vazio) e a linha pendente no final"""
+    blocos = ['\n'.join(linhas) if linhas else None
+              for linhas in api_cnis._limpar_paginas(paginas)]
+    if len(blocos) == len(paginas):
+        blocos.append(None)
+    return blocos
+
+
+def _limpar_nativo(paginas):
+    limpeza = api_cnis._PADROES_NATIVOS.documento()
+    return [limpeza.pagina(texto) for texto in paginas] + [limpeza.finalizar()]
+
+
+@unittest.skipIf(api_cnis.cnis_clean is None, 'extensão cnis_clean não instalada')
+class TestParidadeCnisClean(unittest.TestCase):
+
+    def assertMesmoResultado(self, paginas):
+        self.assertEqual(_limpar_nativo(paginas), _limpar_python(paginas),
+                         msg=repr(paginas))
+
+    def test_casos_fixos(self):
+        for paginas in [[''], ['\n'], ['\n\n\n'], ['EMPREGADO\nDOMÉSTICO'],
+                        ['EMPREGADO 01/02/2020\nDOMÉSTICO'], ['EMPREGADO\n\nDOMÉSTICO'],
+                        ['INSS\nEMPREGADO\nINSS', 'DOMÉSTICO\nFACULTATIVO'],
+                        ['EMPREGADO', '', 'DOMÉSTICO']]:
+            self.assertMesmoResultado(paginas)
+
+    def test_paginas_aleatorias(self):
+        aleatorio = random.Random(1234)
+        for _ in range(5000):
+            paginas = ['\n'.join(aleatorio.choices(LINHAS, k=aleatorio.randint(0, 12)))
+                       for _ in range(aleatorio.randint(1, 4))]
+            self.assertMesmoResultado(paginas)
+
+
+if __name__ == '__main__':
+    unittest.main()
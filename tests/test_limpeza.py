@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+Limpeza do texto em Python (_limpar_paginas), com as saídas esperadas, e a
+busca de cabeçalhos/rodapés pelo Hyperscan comparada à alternação do re.
+
+Roda sem a extensão nativa; a paridade com ela fica em test_cnis_clean.py.
+"""
+
+import random
+import unittest
+from unittest import mock
+
+import api_cnis
+from test_cnis_clean import LINHAS
+
+
+def limpar(*paginas):
+    """Texto limpo do documento formado pelas páginas dadas"""
+    return '\n'.join('\n'.join(linhas)
+                     for linhas in api_cnis._limpar_paginas(paginas) if linhas)
+
+
+class TestLimpeza(unittest.TestCase):
+
+    def test_normaliza_espacos(self):
+        self.assertEqual(limpar('  Nome:   FULANO\tDE  TAL  '), 'Nome: FULANO DE TAL')
+
+    def test_remove_cabecalhos_e_rodapes(self):
+        texto = '\n'.join([
+            'INSS',
+            'CNIS - Cadastro Nacional de Informações Sociais',
+            'Extrato Previdenciário',
+            'Nome: FULANO',
+            '  Página  1 de 2 ',
+            '01/02/2020 10:11:12',
+        ])
+        self.assertEqual(limpar(texto), 'Nome: FULANO')
+
+    def test_mantem_linhas_parecidas_com_cabecalho(self):
+        texto = 'INSS - AGÊNCIA\nPágina 1 de 2 (cont.)\nEmissão 01/02/2020'
+        self.assertEqual(limpar(texto), texto)
+
+    def test_remove_linhas_vazias_duplicadas(self):
+        self.assertEqual(limpar('a\n\n  \n\t\nb'), 'a\n\nb')
+
+    def test_remove_linhas_vazias_duplicadas_entre_paginas(self):
+        self.assertEqual(limpar('a\n', '\nb'), 'a\n\nb')
+
+    def test_linha_vazia_sobra_apos_cabecalho(self):
+        self.assertEqual(limpar('a\n\nINSS\n\nb'), 'a\n\nb')
+
+    def test_junta_termo_de_continuacao(self):
+        self.assertEqual(limpar('EMPREGADO\nDOMÉSTICO'), 'EMPREGADO DOMÉSTICO')
+        self.assertEqual(limpar('CONTRIBUINTE\n  INDIVIDUAL '), 'CONTRIBUINTE INDIVIDUAL')
+
+    def test_junta_termo_de_continuacao_entre_paginas(self):
+        self.assertEqual(limpar('EMPREGADO', 'DOMÉSTICO'), 'EMPREGADO DOMÉSTICO')
+        self.assertEqual(limpar('EMPREGADO\nPágina 1 de 2', 'INSS\nDOMÉSTICO\nx'),
+                         'EMPREGADO DOMÉSTICO\nx')
+
+    def test_junta_apenas_uma_vez(self):
+        self.assertEqual(limpar('a\nFACULTATIVO\nFACULTATIVO'), 'a FACULTATIVO\nFACULTATIVO')
+
+    def test_nao_junta_apos_linha_vazia(self):
+        self.assertEqual(limpar('EMPREGADO\n\nDOMÉSTICO'), 'EMPREGADO\n\nDOMÉSTICO')
+
+    def test_nao_junta_apos_data_ou_valor(self):
+        self.assertEqual(limpar('Início 01/02/2020\nFACULTATIVO'),
+                         'Início 01/02/2020\nFACULTATIVO')
+        self.assertEqual(limpar('Remuneração 1.234,56', 'INDIVIDUAL'),
+                         'Remuneração 1.234,56\nINDIVIDUAL')
+
+    def test_junta_quando_data_nao_esta_no_fim(self):
+        self.assertEqual(limpar('01/02/2020 EMPREGADO\nDOMESTICO'),
+                         '01/02/2020 EMPREGADO DOMESTICO')
+
+    def test_documento_vazio(self):
+        self.assertEqual(limpar(), '')
+        self.assertEqual(limpar('INSS', '  '), '')
+
+
+@unittest.skipIf(api_cnis.hyperscan is None, 'hyperscan não instalado')
+class TestHyperscan(unittest.TestCase):
+    """Cabeçalhos/rodapés achados pelo Hyperscan x a alternação do módulo re"""
+
+    def setUp(self):
+        # Compila o banco mesmo quando a extensão nativa o dispensa
+        patcher = mock.patch.object(api_cnis, '_HS_DATABASE', api_cnis._compilar_hyperscan())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def assertMesmosIndices(self, linhas):
+        linhas = [' '.join(linha.split()) for linha in linhas]
+        esperado = {i for i, linha in enumerate(linhas)
+                    if api_cnis._RE_HEADER_FOOTER.match(linha)}
+        self.assertEqual(api_cnis._indices_cabecalho_rodape(linhas), esperado,
+                         msg=repr(linhas))
+
+    def test_casos_fixos(self):
+        for linhas in [[], [''], ['INSS'], ['', 'INSS', ''], ['INSS', 'INSS'],
+                       ['Página 1 de 2 INSS', 'x INSS'], ['ç', 'Extrato Previdenciário']]:
+            self.assertMesmosIndices(linhas)
+
+    def test_linhas_aleatorias(self):
+        aleatorio = random.Random(4321)
+        for _ in range(5000):
+            self.assertMesmosIndices(aleatorio.choices(LINHAS, k=aleatorio.randint(0, 12)))
+
+
+if __name__ == '__main__':
+    unittest.main()